@@ -1,9 +1,17 @@
+from collections import Counter
 from flask import Flask, render_template, request, session, jsonify
+from markupsafe import escape as _markup_escape
+from functools import lru_cache
+import gzip
+import heapq
 import json
 import os
 import re
-from models.disease_predictor import DiseasePredictionModel
-from utils.preprocessing import TextPreprocessor
+import sys
+import threading
+import uuid
+import zlib
+from models.disease_predictor import DiseasePredictionModel, _load_json_file
 
 _BASE_DIR = os.path.dirname(__file__)
 _DATA_DIR = os.path.join(_BASE_DIR, 'data')
@@ -12,6 +20,29 @@ _SCENARIOS_PATH = os.path.join(_DATA_DIR, 'scenarios.txt')
 
 _BOT_NAME = "Anna Balla"
 
+# All patterns used on the request path, compiled once at module load.
+_NAME_INTRO_RE = re.compile(
+    r"\b(?:my\s+name\s+is|i\s+am|i'm)\s+([A-Za-z][A-Za-z\-']{1,30}(?:\s+[A-Za-z][A-Za-z\-']{1,30})?)\b",
+    re.IGNORECASE,
+)
+_NAME_JUNK_RE = re.compile(r"[^A-Za-z\-\s']")
+_WHITESPACE_RE = re.compile(r"\s+")
+_CHILD_WORD_RE = re.compile(r"\b(child|kid|baby|toddler|infant|son|daughter)\b")
+_AGE_RE = re.compile(r"\b(\d{1,2})\s*(?:yo|y/o|years?\s*old)\b")
+_MED_KEY_JUNK_RE = re.compile(r"[^a-z0-9]+")
+# One pass over the dosage text instead of three; named groups tell us which
+# frequency matched.
+_DOSE_RE = re.compile(
+    r"\b(?:"
+    r"(?P<once>once\s*(?:a\s*)?day|once\s*daily|od|1\s*(?:tablet|tab)\s*(?:once\s*)?daily)"
+    r"|(?P<twice>twice\s*(?:a\s*)?day|twice\s*daily|bid|2\s*times\s*(?:a\s*)?day)"
+    r"|(?P<frequent>three\s*times|3\s*times|every\s*\d+\s*(?:hours?|hrs?)|q\d+h)"
+    r")\b"
+)
+_SCENARIO_NAME_RE = re.compile(r"\b(okay|ok)[,\s]+[A-Z][a-z]+\s+[A-Z][a-z]+\b", re.IGNORECASE)
+_NAME_QUESTION_RE = re.compile(r"\b(my\s+name\s+is|may\s+i\s+know\s+your\s+name|what\s+is\s+your\s+name)\b")
+_GREETING_RE = re.compile(r"(hi|hey|hello|hy|hii+|good\s*(morning|afternoon|evening))\b[!. ]*")
+
 # Define absolute paths for templates and static files
 template_dir = os.path.join(os.path.dirname(__file__), 'templates')
 static_dir = os.path.join(os.path.dirname(__file__), 'static')
@@ -19,19 +50,86 @@ static_dir = os.path.join(os.path.dirname(__file__), 'static')
 # Initialize Flask app with specified template and static folders
 app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
 
+# Serialize /chat payloads with orjson when it's installed: the response body
+# is the whole rendered chat history, which the default encoder re-serializes
+# noticeably slower. Optional, like the catalog parsing fast path.
+try:
+    import orjson as _resp_orjson
+except ImportError:
+    _resp_orjson = None
+
+if _resp_orjson is not None:
+    from flask.json.provider import JSONProvider
+
+    class _OrjsonProvider(JSONProvider):
+        def dumps(self, obj, **kwargs):
+            return _resp_orjson.dumps(obj).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return _resp_orjson.loads(s)
+
+    app.json = _OrjsonProvider(app)
+
 # # Set secret key from environment variable with a safe development fallback
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'dev-secret-key-change-me')
 
-# Load models once on startup
+# Heavy helpers are cached independently and built on first use so that a
+# change (or absence) of one never forces rebuilding the others.
 # `data/scenarios.txt` is used ONLY for communication style (questions/tone).
 # `data/medicines.json` is used as the medical knowledge base (disease/symptoms -> medicines).
-predictor = DiseasePredictionModel(
-    data_paths=[_MEDICINES_PATH],
-    scenario_path=_SCENARIOS_PATH,
-    use_scenarios_for_training=False,
-)
+_PREDICTOR = None
+_PREDICTOR_LOCK = threading.Lock()
+
+# NLTK-backed preprocessor (only needed once symptoms are being analyzed)
+_PREPROCESSOR = None
+_PREPROCESSOR_LOCK = threading.Lock()
+
+
+def _get_predictor() -> DiseasePredictionModel:
+    """Lazily build the scenario-style predictor (parses scenarios.txt once)."""
+    global _PREDICTOR
+    if _PREDICTOR is None:
+        with _PREDICTOR_LOCK:
+            if _PREDICTOR is None:
+                _PREDICTOR = DiseasePredictionModel(
+                    data_paths=[_MEDICINES_PATH],
+                    scenario_path=_SCENARIOS_PATH,
+                    use_scenarios_for_training=False,
+                )
+    return _PREDICTOR
+
 
-preprocessor = TextPreprocessor()
+def _get_preprocessor():
+    """Lazily build the NLTK preprocessor (may download NLTK data once).
+
+    The import lives here too: pulling in `utils.preprocessing` drags the whole
+    NLTK stack into the process, which is wasted work until symptoms arrive.
+    """
+    global _PREPROCESSOR
+    if _PREPROCESSOR is None:
+        with _PREPROCESSOR_LOCK:
+            if _PREPROCESSOR is None:
+                from utils.preprocessing import TextPreprocessor
+                _PREPROCESSOR = TextPreprocessor()
+    return _PREPROCESSOR
+
+
+def _warm_heavy_helpers_async():
+    """Build the predictor and preprocessor on a background thread.
+
+    Startup stays fast (the first page is static chrome anyway), while the
+    scenarios.txt parse and NLTK setup usually finish before the first real
+    symptom message arrives. Failures are swallowed here; the lazy accessors
+    retry and surface errors on first actual use.
+    """
+    def _warm():
+        try:
+            _get_predictor()
+            _get_preprocessor()
+        except Exception:
+            pass
+
+    threading.Thread(target=_warm, name='warm-helpers', daemon=True).start()
 
 # medicines.json product catalog cache (contains disease/symptoms/dosage per item)
 _MEDICINE_CATALOG = None
@@ -39,28 +137,93 @@ _MEDICINE_CATALOG = None
 # Cache of symptom words (derived from known symptom phrases)
 _SYMPTOM_WORDS = None
 
+# Inverted index: symptom token -> sorted catalog row ids (recommendable items only)
+_SYMPTOM_INDEX = None
+
 
 def _html_escape(text: str) -> str:
-    return (
-        (text or "")
-        .replace("&", "&amp;")
-        .replace("<", "&lt;")
-        .replace(">", "&gt;")
-        .replace('"', "&quot;")
-        .replace("'", "&#39;")
-    )
+    # markupsafe's C implementation escapes in one pass instead of five
+    # chained str.replace copies.
+    return str(_markup_escape(text or ""))
+
+
+# Static bot messages, built once at import time (these never change per request).
+_WELCOME_HTML = (
+    f"<div><strong>Welcome</strong></div>"
+    f"<div style=\"margin-top:0.35rem;\">Hello! I’m <strong>{_BOT_NAME}</strong>, your medical assistant. I can help you understand symptoms and suggest medicines from our dataset (educational only).</div>"
+    f"<div style=\"margin-top:0.65rem;\"><strong>Name</strong></div>"
+    f"<div style=\"margin-top:0.35rem;\">May I know your name?</div>"
+    f"<div style=\"margin-top:0.65rem; color: rgba(255,255,255,0.78);\"><strong>Safety:</strong> If symptoms are severe or worsening, seek urgent medical care.</div>"
+)
+
+_SAFETY_NOTE = "Seek medical care urgently if symptoms are severe or worsening."
+
+_QUICK_QUESTIONS_FULL_HTML = (
+    "<strong>Quick questions:</strong><br>"
+    "1) How long have you had these symptoms?<br>"
+    "2) What are the top 3 symptoms (for example: cough/sore throat, vomiting/diarrhea, burning urination, headache)?<br>"
+    "3) Any emergency warning signs (chest pain, trouble breathing, confusion, blood in vomit/stool/urine)?<br><br>"
+    f"<strong>Safety note:</strong> {_SAFETY_NOTE}"
+)
+
+_QUICK_QUESTIONS_SHORT_HTML = (
+    "<strong>Quick questions:</strong><br>"
+    "1) How long have you had these symptoms?<br>"
+    "2) What other symptoms do you have (cough/sore throat, vomiting/diarrhea, shortness of breath)?<br><br>"
+    f"<strong>Safety note:</strong> {_SAFETY_NOTE}"
+)
+
+_NAME_RETRY_MESSAGE = "I didn’t catch your name. May I know your name?"
+
+# Only the (escaped) name varies; everything else is static per request.
+_MEET_GREETING_TEMPLATE = (
+    "Nice to meet you, <strong>{name}</strong>!<br><br>"
+    "<div><strong>Symptoms</strong></div>"
+    "<div style=\"margin-top:0.35rem;\">How can I help today? Please describe your symptoms (and how long you’ve had them).</div>"
+)
+
+
+# Compiled once; Jinja renders the whole recommendations reply in one call
+# instead of concatenating per-card fragments in Python. Flask autoescapes
+# string templates, so catalog/user values are escaped for free and only the
+# follow-ups fragment (already HTML) is marked safe.
+_RECOMMENDATION_REPLY_TEMPLATE = app.jinja_env.from_string(
+    "<div><strong>Summary</strong></div>"
+    "<div style=\"margin-top:0.35rem;\">{% if user_name %}{{ user_name }}, {% endif %}here’s what I found from your symptoms:</div><br>"
+    "<div><strong>Recommendations</strong></div>"
+    "<div style=\"margin-top:0.35rem;\">One best medicine per detected condition (not an exhaustive list).</div>"
+    "<ul style=\"margin: 0.5rem 0 0.75rem 1.25rem;\">"
+    "{% for rec in recs %}{% set med = rec.medicine %}"
+    "<li style=\"margin-bottom: 0.75rem;\">"
+    "<strong>{{ rec.cluster_label or 'Possible condition' }}:</strong> {{ med.name or 'a suitable medicine' }}"
+    "{% if med.dosage %} — <em>Dosage:</em> {{ med.dosage }}{% endif %}"
+    "{% if med.url %} <a href=\"{{ med.url }}\" target=\"_blank\" rel=\"noopener noreferrer\">View</a>{% endif %}"
+    "<div style=\"margin-top:0.35rem;\">"
+    "<img src=\"{{ med.image }}\" alt=\"{{ med.name }}\" "
+    "style=\"max-width:160px; width:160px; height:auto; border-radius:10px; border:1px solid rgba(255,255,255,0.06);\">"
+    "</div>"
+    "{% if rec.why %}"
+    "<div style=\"margin-top: 0.25rem; color: rgba(255,255,255,0.78);\">"
+    "<em>Why this medicine:</em> {{ rec.why[:3]|join('; ') }}"
+    "</div>"
+    "{% endif %}"
+    "</li>"
+    "{% endfor %}"
+    "</ul>"
+    "<div style=\"color: rgba(255,255,255,0.75); font-size: 0.95em;\">"
+    "Educational only — always follow the label and consult a clinician if unsure."
+    "</div>"
+    "<br>"
+    "{{ followups_html|safe }}"
+    "<div style=\"margin-top:0.65rem;\"><strong>Safety note:</strong> {{ safety_note }}</div>"
+)
 
 
 def _format_welcome() -> str:
-    return (
-        f"<div><strong>Welcome</strong></div>"
-        f"<div style=\"margin-top:0.35rem;\">Hello! I’m <strong>{_BOT_NAME}</strong>, your medical assistant. I can help you understand symptoms and suggest medicines from our dataset (educational only).</div>"
-        f"<div style=\"margin-top:0.65rem;\"><strong>Name</strong></div>"
-        f"<div style=\"margin-top:0.35rem;\">May I know your name?</div>"
-        f"<div style=\"margin-top:0.65rem; color: rgba(255,255,255,0.78);\"><strong>Safety:</strong> If symptoms are severe or worsening, seek urgent medical care.</div>"
-    )
+    return _WELCOME_HTML
 
 
+@lru_cache(maxsize=256)
 def _extract_name(text: str) -> str | None:
     """Best-effort extraction of a person's name from a short message."""
     raw = (text or "").strip()
@@ -68,14 +231,14 @@ def _extract_name(text: str) -> str | None:
         return None
 
     # Common patterns
-    m = re.search(r"\b(?:my\s+name\s+is|i\s+am|i'm)\s+([A-Za-z][A-Za-z\-']{1,30}(?:\s+[A-Za-z][A-Za-z\-']{1,30})?)\b", raw, flags=re.IGNORECASE)
+    m = _NAME_INTRO_RE.search(raw)
     if m:
         candidate = m.group(1).strip()
     else:
         candidate = raw
 
-    candidate = re.sub(r"[^A-Za-z\-\s']", "", candidate).strip()
-    candidate = re.sub(r"\s+", " ", candidate)
+    candidate = _NAME_JUNK_RE.sub("", candidate).strip()
+    candidate = _WHITESPACE_RE.sub(" ", candidate)
     if not candidate:
         return None
 
@@ -105,19 +268,66 @@ def _ensure_welcome_in_history():
         session['symptom_history'] = []
 
 
+# Product-category markers, shared by catalog loading and scoring.
+_ANTIBIOTIC_MARKERS = frozenset({
+    'amoxicillin', 'amoxycillin', 'azithromycin', 'ciprofloxacin', 'cefixime',
+    'ceftriaxone', 'metronidazole', 'doxycycline', 'clavulanate',
+    'antibiotic', 'cephalosporin',
+})
+_ANTIHISTAMINE_MARKERS = frozenset({
+    'cetirizine', 'levocetirizine', 'loratadine', 'desloratadine', 'fexofenadine',
+    'rigix', 'zyrtec', 'claritin', 'telfast',
+})
+_COUGH_PRODUCT_MARKERS = frozenset({
+    'cough', 'expectorant', 'antitussive', 'guaifenesin', 'dextromethorphan',
+    'ambroxol', 'bromhexine',
+})
+
+# One compiled alternation scans an item's text for all three marker
+# categories in a single pass (the closest stdlib gets to an Aho-Corasick
+# automaton); lastgroup says which category a hit belongs to.
+_CATEGORY_MARKER_RE = re.compile(
+    "(?P<antibiotic>" + "|".join(sorted(_ANTIBIOTIC_MARKERS)) + ")"
+    "|(?P<antihistamine>" + "|".join(sorted(_ANTIHISTAMINE_MARKERS)) + ")"
+    "|(?P<cough>" + "|".join(sorted(_COUGH_PRODUCT_MARKERS)) + ")"
+)
+
+
+def _scan_category_markers(med_text: str) -> dict[str, bool]:
+    """Return which marker categories appear in the item text (one scan)."""
+    flags = {'antibiotic': False, 'antihistamine': False, 'cough': False}
+    for m in _CATEGORY_MARKER_RE.finditer(med_text):
+        flags[m.lastgroup] = True
+        if flags['antibiotic'] and flags['antihistamine'] and flags['cough']:
+            break
+    return flags
+
+
+# User-symptom indicators consulted during scoring.
+_COUGH_INDICATORS = frozenset({'cough', 'coughing', 'phlegm', 'sputum'})
+_ALLERGY_INDICATORS = frozenset({
+    'sneeze', 'sneezing', 'runny', 'nose', 'itch', 'itching', 'hives', 'allergy',
+    'watery', 'eyes',
+})
+
+
 def _load_medicine_catalog(path: str = _MEDICINES_PATH):
-    """Load product catalog containing disease/symptoms/dosage fields."""
+    """Load product catalog containing disease/symptoms/dosage fields.
+
+    Everything the scorer needs per item (token frozensets, dose form, dosage
+    bonus, category flags) is computed once here rather than per request.
+    """
     global _MEDICINE_CATALOG
     if _MEDICINE_CATALOG is not None:
         return _MEDICINE_CATALOG
 
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            items = json.load(f)
+        # orjson-backed (stdlib fallback) bytes parse, shared with the model.
+        items = _load_json_file(path)
     except FileNotFoundError:
         _MEDICINE_CATALOG = []
         return _MEDICINE_CATALOG
-    except json.JSONDecodeError:
+    except ValueError:
         _MEDICINE_CATALOG = []
         return _MEDICINE_CATALOG
 
@@ -136,9 +346,14 @@ def _load_medicine_catalog(path: str = _MEDICINES_PATH):
             image = (it.get('image') or '').strip()
             url = (it.get('url') or '').strip()
 
-            symptom_tokens = DiseasePredictionModel.normalize_text(symptoms).split() if symptoms else []
-            disease_tokens = DiseasePredictionModel.normalize_text(disease).split() if disease else []
+            # Tokens are interned: thousands of rows repeat the same small
+            # vocabulary, so this deduplicates the strings and lets the
+            # per-request set intersections hit the identity fast path.
+            symptom_tokens = frozenset(map(sys.intern, DiseasePredictionModel.normalize_text(symptoms).split())) if symptoms else frozenset()
+            disease_tokens = frozenset(map(sys.intern, DiseasePredictionModel.normalize_text(disease).split())) if disease else frozenset()
             blob = DiseasePredictionModel.normalize_text(' '.join([disease, symptoms, name]))
+            marker_flags = _scan_category_markers(f"{name} {blob}".lower())
+            dosage_bonus, dosage_label = _dosage_simplicity(dosage)
 
             catalog.append({
                 'type': med_type,
@@ -151,12 +366,40 @@ def _load_medicine_catalog(path: str = _MEDICINES_PATH):
                 'symptom_tokens': symptom_tokens,
                 'disease_tokens': disease_tokens,
                 'blob': blob,
+                'blob_tokens': frozenset(map(sys.intern, blob.split())),
+                'form': _normalize_form(med_type, name),
+                'dosage_bonus': dosage_bonus,
+                'dosage_label': dosage_label,
+                'is_antibiotic': marker_flags['antibiotic'],
+                'is_antihistamine': marker_flags['antihistamine'],
+                'is_cough_product': marker_flags['cough'],
             })
 
     _MEDICINE_CATALOG = catalog
     return _MEDICINE_CATALOG
 
 
+def _get_symptom_index():
+    """Inverted index over the catalog: symptom token -> catalog row ids.
+
+    Only recommendable items are indexed (image present, not an antibiotic),
+    so the scorer can skip those checks. Row ids stay sorted to preserve the
+    catalog-order tie-breaking of the old full scan.
+    """
+    global _SYMPTOM_INDEX
+    if _SYMPTOM_INDEX is None:
+        index = {}
+        for row, it in enumerate(_load_medicine_catalog()):
+            if not (it.get('image') or '').strip():
+                continue
+            if it['is_antibiotic']:
+                continue
+            for tok in it['symptom_tokens']:
+                index.setdefault(tok, []).append(row)
+        _SYMPTOM_INDEX = index
+    return _SYMPTOM_INDEX
+
+
 def _split_diseases(disease_field: str) -> list[str]:
     parts = []
     for p in (disease_field or '').split(','):
@@ -172,67 +415,100 @@ _SYMPTOM_CLUSTERS = [
     {
         'key': 'gastro',
         'label': 'Gastrointestinal upset (e.g., gastroenteritis)',
-        'tokens': {
+        'tokens': frozenset({
             'diarrhea', 'diarrhoea', 'vomit', 'vomiting', 'nausea', 'stomach', 'abdominal', 'cramp',
             'cramps', 'gastric', 'gastro', 'gastroenteritis', 'loose', 'stool', 'dehydration'
-        },
+        }),
     },
     {
         'key': 'respiratory',
         'label': 'Upper respiratory symptoms (e.g., cold/flu/allergies)',
-        'tokens': {
+        'tokens': frozenset({
             'cough', 'coughing', 'runny', 'nose', 'stuffy', 'congestion', 'sneeze', 'sneezing',
             'throat', 'sore', 'phlegm', 'cold', 'flu'
-        },
+        }),
     },
     {
         'key': 'pain_fever',
         'label': 'Fever / pain / headache',
-        'tokens': {
+        'tokens': frozenset({
             'fever', 'temperature', 'pain', 'ache', 'aches', 'headache', 'migraine', 'body', 'chills'
-        },
+        }),
     },
     {
         'key': 'skin',
         'label': 'Skin irritation (rash/itching)',
-        'tokens': {
+        'tokens': frozenset({
             'rash', 'itch', 'itching', 'redness', 'hives', 'eczema', 'acne', 'fungal', 'ringworm'
-        },
+        }),
     },
     {
         'key': 'urinary',
         'label': 'Urinary symptoms (possible UTI)',
-        'tokens': {
+        'tokens': frozenset({
             'burning', 'urination', 'urine', 'frequency', 'urgent', 'urgency', 'painful', 'uti'
-        },
+        }),
     },
 ]
 
+_SKIN_CLUSTER_TOKENS = next(c['tokens'] for c in _SYMPTOM_CLUSTERS if c['key'] == 'skin')
+
+# Union of every cluster's tokens: one intersection decides whether any
+# cluster can match at all before the per-cluster loop runs.
+_ALL_CLUSTER_TOKENS = frozenset().union(*(c['tokens'] for c in _SYMPTOM_CLUSTERS))
+
+# Inverted map: cluster token -> indices of clusters containing it, so
+# detection is one pass over the user's tokens rather than one intersection
+# per cluster.
+_TOKEN_TO_CLUSTERS: dict[str, tuple[int, ...]] = {}
+for _ci, _c in enumerate(_SYMPTOM_CLUSTERS):
+    for _tok in _c['tokens']:
+        _TOKEN_TO_CLUSTERS[_tok] = _TOKEN_TO_CLUSTERS.get(_tok, ()) + (_ci,)
+del _ci, _c, _tok
+
 
 def _detect_clusters(user_text: str):
-    """Return clusters present in the user text, ranked by overlap."""
+    """Return clusters present in the user text, ranked by overlap.
+
+    Each returned cluster carries its full token set so downstream scoring
+    never has to look it up in _SYMPTOM_CLUSTERS again.
+    """
     user_tokens = _normalize_tokens(user_text)
+    matched_tokens = user_tokens & _ALL_CLUSTER_TOKENS
+    if not matched_tokens:
+        return []
+
+    # Tally overlaps per cluster in one pass over the matched tokens.
+    overlaps = Counter()
+    overlap_tokens_by_cluster = {}
+    for tok in matched_tokens:
+        for ci in _TOKEN_TO_CLUSTERS[tok]:
+            overlaps[ci] += 1
+            overlap_tokens_by_cluster.setdefault(ci, set()).add(tok)
+
+    # Rank by overlap; iterating cluster indices in definition order keeps the
+    # original stable tie-breaking.
     ranked = []
-    for c in _SYMPTOM_CLUSTERS:
-        overlap_tokens = user_tokens & c['tokens']
-        if not overlap_tokens:
-            continue
+    for ci in sorted(overlaps):
+        c = _SYMPTOM_CLUSTERS[ci]
         ranked.append({
             'key': c['key'],
             'label': c['label'],
-            'overlap_tokens': overlap_tokens,
-            'overlap': len(overlap_tokens),
+            'tokens': c['tokens'],
+            'overlap_tokens': overlap_tokens_by_cluster[ci],
+            'overlap': overlaps[ci],
         })
     ranked.sort(key=lambda x: x['overlap'], reverse=True)
     return ranked
 
 
+@lru_cache(maxsize=256)
 def _infer_patient_age_group(user_text: str) -> str:
     """Best-effort: returns 'child' or 'adult'."""
     t = (user_text or '').lower()
-    if re.search(r"\b(child|kid|baby|toddler|infant|son|daughter)\b", t):
+    if _CHILD_WORD_RE.search(t):
         return 'child'
-    m = re.search(r"\b(\d{1,2})\s*(?:yo|y/o|years?\s*old)\b", t)
+    m = _AGE_RE.search(t)
     if m:
         try:
             age = int(m.group(1))
@@ -284,7 +560,7 @@ def _medicine_unique_key(med: dict) -> str:
     name = name.strip().lower()
     # Keep letters and digits (so strengths like 10mg vs 5mg remain distinct),
     # but normalize punctuation/whitespace.
-    name = re.sub(r"[^a-z0-9]+", " ", name)
+    name = _MED_KEY_JUNK_RE.sub(" ", name)
     name = " ".join(name.split())
     return name
 
@@ -295,19 +571,20 @@ def _dosage_simplicity(dosage: str) -> tuple[float, str | None]:
     if not d:
         return 0.0, None
 
-    # Strong preference: once daily.
-    if re.search(r"\b(once\s*(a\s*)?day|once\s*daily|od|1\s*(tablet|tab)\s*daily|1\s*(tablet|tab)\s*once\s*daily)\b", d):
-        return 1.5, 'once daily'
-
-    # Next best: twice daily.
-    if re.search(r"\b(twice\s*(a\s*)?day|twice\s*daily|bid|2\s*times\s*(a\s*)?day)\b", d):
-        return 0.6, 'twice daily'
+    # Strong preference: once daily; then twice daily; frequent dosing is
+    # penalized. Scan every match so "2 times a day or once daily" still
+    # resolves to the friendliest frequency, as the old three-pass code did.
+    best = None
+    for m in _DOSE_RE.finditer(d):
+        group = m.lastgroup
+        if group == 'once':
+            return 1.5, 'once daily'
+        if group == 'twice':
+            best = (0.6, 'twice daily')
+        elif best is None:
+            best = (-0.4, 'multiple times daily')
 
-    # Penalize frequent dosing.
-    if re.search(r"\b(three\s*times|3\s*times|every\s*\d+\s*(hours?|hrs?)|q\d+h)\b", d):
-        return -0.4, 'multiple times daily'
-
-    return 0.0, None
+    return best if best is not None else (0.0, None)
 
 
 def _category_boost(user_tokens: set[str], med: dict) -> tuple[float, list[str]]:
@@ -315,28 +592,13 @@ def _category_boost(user_tokens: set[str], med: dict) -> tuple[float, list[str]]
 
     Goal: if the user mainly reports cough, prefer cough/cold products over
     allergy-only antihistamines unless allergy indicators are present.
+    Category membership is precomputed on the catalog item at load time.
     """
-    blob = ((med or {}).get('blob') or '')
-    name = ((med or {}).get('name') or '')
-    med_text = f"{name} {blob}".lower()
-
-    cough_indicators = {'cough', 'coughing', 'phlegm', 'sputum'}
-    allergy_indicators = {'sneeze', 'sneezing', 'runny', 'nose', 'itch', 'itching', 'hives', 'allergy', 'watery', 'eyes'}
+    has_cough = bool(user_tokens & _COUGH_INDICATORS)
+    has_allergy = bool(user_tokens & _ALLERGY_INDICATORS)
 
-    has_cough = bool(user_tokens & cough_indicators)
-    has_allergy = bool(user_tokens & allergy_indicators)
-
-    antihistamine_markers = {
-        'cetirizine', 'levocetirizine', 'loratadine', 'desloratadine', 'fexofenadine',
-        'rigix', 'zyrtec', 'claritin', 'telfast'
-    }
-    cough_markers = {
-        'cough', 'expectorant', 'antitussive', 'guaifenesin', 'dextromethorphan',
-        'ambroxol', 'bromhexine'
-    }
-
-    is_antihistamine = any(m in med_text for m in antihistamine_markers)
-    is_cough_product = any(m in med_text for m in cough_markers)
+    is_antihistamine = bool((med or {}).get('is_antihistamine'))
+    is_cough_product = bool((med or {}).get('is_cough_product'))
 
     score = 0.0
     why = []
@@ -354,38 +616,30 @@ def _category_boost(user_tokens: set[str], med: dict) -> tuple[float, list[str]]
         why.append('Fits allergy indicators (runny nose/sneezing/itching)')
 
     # Avoid pushing antibiotics as a default OTC suggestion.
-    antibiotic_markers = {
-        'amoxicillin', 'amoxycillin', 'azithromycin', 'ciprofloxacin', 'cefixime',
-        'ceftriaxone', 'metronidazole', 'doxycycline', 'clavulanate'
-    }
-    if any(m in med_text for m in antibiotic_markers):
+    if (med or {}).get('is_antibiotic'):
         score -= 1.0
         why.append('Prescription antibiotic (not OTC by default)')
 
     return score, why
 
 
-def _is_antibiotic_product(med: dict) -> bool:
-    """Hard safety guard: do not recommend antibiotics as default suggestions."""
-    blob = ((med or {}).get('blob') or '')
-    name = ((med or {}).get('name') or '')
-    med_text = f"{name} {blob}".lower()
-    antibiotic_markers = {
-        'amoxicillin', 'amoxycillin', 'azithromycin', 'ciprofloxacin', 'cefixime',
-        'ceftriaxone', 'metronidazole', 'doxycycline', 'clavulanate',
-        'antibiotic', 'cephalosporin',
-    }
-    return any(m in med_text for m in antibiotic_markers)
-
-
 def _recommend_one_medicine_per_cluster(user_text: str, max_clusters: int = 3):
     """Detect symptom clusters, then recommend ONE medicine per cluster.
 
-    Also enforces uniqueness so the same medicine is not recommended multiple times.
+    Results are memoized per canonicalized input so repeated or re-combined
+    symptom descriptions skip the catalog scan entirely. Canonicalization keeps
+    digits (age detection needs them) and only folds case/whitespace.
 
     Returns:
         list[dict]: [{cluster_label, medicine, why(list[str])}]
     """
+    canonical = ' '.join((user_text or '').lower().split())
+    return _recommend_for_canonical(canonical, max_clusters)
+
+
+@lru_cache(maxsize=256)
+def _recommend_for_canonical(user_text: str, max_clusters: int):
+    """Memoized body of `_recommend_one_medicine_per_cluster`."""
     catalog = _load_medicine_catalog()
     if not catalog:
         return []
@@ -399,94 +653,112 @@ def _recommend_one_medicine_per_cluster(user_text: str, max_clusters: int = 3):
     if not clusters:
         return []
 
-    # Build candidate lists per cluster.
-    skin_tokens = next((c['tokens'] for c in _SYMPTOM_CLUSTERS if c['key'] == 'skin'), set())
+    # Prefilter via the inverted index: only rows sharing at least one symptom
+    # token with the user can score, so the cluster loops never touch the rest
+    # of the catalog. The index also enforces the image and antibiotic guards.
+    index = _get_symptom_index()
+    candidate_rows = set()
+    for tok in user_tokens:
+        candidate_rows.update(index.get(tok, ()))
+    # Nothing in the catalog shares a symptom token with this input: no
+    # amount of cluster scoring can produce a pick, so stop here.
+    if not candidate_rows:
+        return []
+    candidate_rows = sorted(candidate_rows)
+
+    # Score each candidate row's cluster-independent parts once, up front.
+    # Only the cluster-overlap bonus, the skin-form penalty, and the matched
+    # preview differ between clusters, so the cluster loop below touches a
+    # small precomputed tuple per row instead of redoing set algebra.
+    scored_rows = []
+    for row in candidate_rows:
+        it = catalog[row]
+
+        symptom_match = user_tokens & it['symptom_tokens']
+        if not symptom_match:
+            continue
 
-    candidates_by_cluster = {}
-    for c in clusters:
-        c_tokens = next((cc['tokens'] for cc in _SYMPTOM_CLUSTERS if cc['key'] == c['key']), set())
-        cand = []
-        best_by_key = {}
-        for it in catalog:
-            # Requirement: ALWAYS include medicine images.
-            if not (it.get('image') or '').strip():
-                continue
+        med_key = _medicine_unique_key(it)
+        if not med_key:
+            continue
 
-            # Safety: do not recommend antibiotics by default.
-            if _is_antibiotic_product(it):
-                continue
+        disease_match = user_tokens & it['disease_tokens']
+        blob_overlap = len(user_tokens & it['blob_tokens'])
 
-            symptom_tokens = set(it.get('symptom_tokens') or [])
-            disease_tokens = set(it.get('disease_tokens') or [])
-            blob_tokens = set((it.get('blob') or '').split())
+        form = it['form']
+        form_bonus = 0.0
+        if age_group == 'adult':
+            if form in {'tablet', 'capsule'}:
+                form_bonus += 1.2
+            if form in {'syrup', 'suspension', 'drops', 'liquid'}:
+                form_bonus -= 0.2
+        else:
+            if form in {'syrup', 'suspension', 'drops', 'liquid'}:
+                form_bonus += 1.2
+            if form in {'tablet', 'capsule'}:
+                form_bonus -= 1.0
 
+        category_bonus, category_why = _category_boost(user_tokens, it)
+
+        shared_score = (
+            (1.0 * len(symptom_match)) + (0.5 * len(disease_match)) + (0.25 * blob_overlap)
+            + form_bonus + it['dosage_bonus'] + category_bonus
+        )
+
+        why_shared = []
+        if age_group == 'child' and form in {'syrup', 'suspension', 'drops', 'liquid'}:
+            why_shared.append(f"Preferred form for a child: {form}")
+        elif age_group == 'adult' and form in {'tablet', 'capsule'}:
+            why_shared.append(f"Preferred adult form: {form}")
+        elif form != 'unknown':
+            why_shared.append(f"Form suitability: {form}")
+        if it['dosage_label']:
+            why_shared.append(f"Simple dosing: {it['dosage_label']}")
+        if category_why:
+            why_shared.extend(category_why[:2])
+
+        scored_rows.append((it, med_key, symptom_match, form, shared_score, why_shared))
+
+    has_skin_symptoms = bool(user_tokens & _SKIN_CLUSTER_TOKENS)
+
+    # Build candidate lists per cluster.
+    candidates_by_cluster = {}
+    for c in clusters:
+        c_tokens = c['tokens']
+        best_by_key = {}
+        for it, med_key, symptom_match, form, shared_score, why_shared in scored_rows:
             # Must match BOTH: user symptoms and cluster relevance.
-            symptom_match = user_tokens & symptom_tokens
-            if not symptom_match:
-                continue
             cluster_match = symptom_match & c_tokens
             if not cluster_match:
                 continue
 
-            disease_match = user_tokens & disease_tokens
-            blob_overlap = len(user_tokens & blob_tokens)
-
-            base_score = (4.0 * len(cluster_match)) + (1.0 * len(symptom_match)) + (0.5 * len(disease_match)) + (0.25 * blob_overlap)
-
-            form = _normalize_form(it.get('type') or '', it.get('name') or '')
-            form_bonus = 0.0
-            if age_group == 'adult':
-                if form in {'tablet', 'capsule'}:
-                    form_bonus += 1.2
-                if form in {'syrup', 'suspension', 'drops', 'liquid'}:
-                    form_bonus -= 0.2
-            else:
-                if form in {'syrup', 'suspension', 'drops', 'liquid'}:
-                    form_bonus += 1.2
-                if form in {'tablet', 'capsule'}:
-                    form_bonus -= 1.0
+            total_score = (4.0 * len(cluster_match)) + shared_score
 
             # Skin products should only be chosen for skin cluster.
             if form in {'cream', 'ointment', 'lotion', 'gel'}:
                 if c['key'] != 'skin':
-                    form_bonus -= 1.5
-                elif not (user_tokens & skin_tokens):
-                    form_bonus -= 0.5
-
-            dosage_bonus, dosage_label = _dosage_simplicity(it.get('dosage') or '')
-
-            category_bonus, category_why = _category_boost(user_tokens, it)
+                    total_score -= 1.5
+                elif not has_skin_symptoms:
+                    total_score -= 0.5
 
-            total_score = base_score + form_bonus + dosage_bonus + category_bonus
             if total_score <= 0:
                 continue
 
-            matched_preview = sorted(list(cluster_match))[:4]
-            why = []
-            if matched_preview:
-                why.append("Matches your symptoms: " + ', '.join(matched_preview))
-            if age_group == 'child' and form in {'syrup', 'suspension', 'drops', 'liquid'}:
-                why.append(f"Preferred form for a child: {form}")
-            elif age_group == 'adult' and form in {'tablet', 'capsule'}:
-                why.append(f"Preferred adult form: {form}")
-            elif form != 'unknown':
-                why.append(f"Form suitability: {form}")
-            if dosage_label:
-                why.append(f"Simple dosing: {dosage_label}")
-            if category_why:
-                why.extend(category_why[:2])
-
-            entry = {'score': total_score, 'medicine': it, 'why': why}
-            med_key = _medicine_unique_key(it)
-            if not med_key:
-                continue
-            prev = best_by_key.get(med_key)
-            if (prev is None) or (entry['score'] > prev['score']):
-                best_by_key[med_key] = entry
+            matched_preview = sorted(cluster_match)[:4]
+            why = (["Matches your symptoms: " + ', '.join(matched_preview)] if matched_preview else []) + why_shared
 
-        cand = list(best_by_key.values())
+            # Plain (score, med_key, item, why) tuples: far lighter than dicts
+            # for the hundreds of candidates a busy input can produce, and the
+            # med_key travels with the entry so the greedy pass below never
+            # recomputes it.
+            prev = best_by_key.get(med_key)
+            if (prev is None) or (total_score > prev[0]):
+                best_by_key[med_key] = (total_score, med_key, it, why)
 
-        cand.sort(key=lambda x: x['score'], reverse=True)
+        # Each cluster contributes at most one pick and can be forced to skip at
+        # most (max_clusters - 1) medicines already used by earlier clusters, so
+        # the top max_clusters candidates are all we ever inspect — no full sort.
+        cand = heapq.nlargest(max(1, max_clusters), best_by_key.values(), key=lambda x: x[0])
         candidates_by_cluster[c['key']] = cand
 
     # Greedy assignment: pick best unique medicine per cluster.
@@ -495,19 +767,15 @@ def _recommend_one_medicine_per_cluster(user_text: str, max_clusters: int = 3):
     for c in clusters:
         if len(picks) >= max(1, max_clusters):
             break
-        for cand in candidates_by_cluster.get(c['key'], []):
-            med = cand['medicine']
-            med_id = _medicine_unique_key(med)
-            if not med_id:
-                continue
+        for score, med_id, med, why in candidates_by_cluster.get(c['key'], []):
             if med_id in used_meds:
                 continue
             used_meds.add(med_id)
             picks.append({
                 'cluster_label': c['label'],
                 'medicine': med,
-                'why': cand.get('why') or [],
-                'score': cand.get('score', 0),
+                'why': why,
+                'score': score,
             })
             break
 
@@ -523,13 +791,13 @@ def _sanitize_style_line(line: str) -> str | None:
     lower = t.lower()
 
     # Never allow scenario hardcoded names to leak into the chat.
-    if re.search(r"\b(okay|ok)[,\s]+[A-Z][a-z]+\s+[A-Z][a-z]+\b", t, flags=re.IGNORECASE):
+    if _SCENARIO_NAME_RE.search(t):
         return None
     if 'imran ali' in lower:
         return None
 
     # Avoid re-asking for the name (we manage name collection explicitly).
-    if re.search(r"\b(my\s+name\s+is|may\s+i\s+know\s+your\s+name|what\s+is\s+your\s+name)\b", lower):
+    if _NAME_QUESTION_RE.search(lower):
         return None
     # Drop explicit diagnosis/conclusion lines
     banned_phrases = [
@@ -563,9 +831,11 @@ def _sanitize_style_line(line: str) -> str | None:
     return None
 
 
-def _render_style_followups(user_text: str, limit: int = 3) -> str:
+def _render_style_followups(user_text: str, limit: int = 3, user_tokens=None) -> str:
     """Use scenarios.txt only for question style (sanitized)."""
-    lines = predictor.get_scenario_followups(user_text, top_k=max(6, limit * 2))
+    lines = _get_predictor().get_scenario_followups(
+        user_text, top_k=max(6, limit * 2), user_tokens=user_tokens
+    )
     cleaned = []
     for ln in lines:
         s = _sanitize_style_line(ln)
@@ -588,58 +858,136 @@ def _render_style_followups(user_text: str, limit: int = 3) -> str:
     )
 
 
+# Small fallback set to keep the bot responsive even with sparse datasets.
+_FALLBACK_SYMPTOM_WORDS = frozenset({
+    'fever', 'temperature', 'headache', 'pain', 'ache', 'aches', 'nausea', 'vomit', 'vomiting',
+    'diarrhea', 'diarrhoea', 'cough', 'sore', 'throat', 'runny', 'nose', 'congestion',
+    'burning', 'urination', 'rash', 'itching', 'redness', 'fatigue', 'flu'
+})
+
+
 def _get_symptom_words():
     global _SYMPTOM_WORDS
     if _SYMPTOM_WORDS is not None:
         return _SYMPTOM_WORDS
 
-    words = set()
+    # Symptom words learned from the medicines.json catalog plus the fallback
+    # vocabulary, frozen once (this is built during the import-time warm).
+    _SYMPTOM_WORDS = _FALLBACK_SYMPTOM_WORDS.union(
+        *(item['symptom_tokens'] for item in _load_medicine_catalog())
+    )
+    return _SYMPTOM_WORDS
+
 
-    # Also learn symptom words from medicines.json catalog.
-    for item in _load_medicine_catalog():
-        for w in (item.get('symptom_tokens') or []):
-            words.add(w)
+# Warm the catalog-derived caches at startup so the first request only pays
+# for dictionary lookups, not for parsing medicines.json.
+_load_medicine_catalog()
+_get_symptom_words()
+_get_symptom_index()
 
-    # Small fallback set to keep the bot responsive even with sparse datasets.
-    words.update({
-        'fever', 'temperature', 'headache', 'pain', 'ache', 'aches', 'nausea', 'vomit', 'vomiting',
-        'diarrhea', 'diarrhoea', 'cough', 'sore', 'throat', 'runny', 'nose', 'congestion',
-        'burning', 'urination', 'rash', 'itching', 'redness', 'fatigue', 'flu'
-    })
-    _SYMPTOM_WORDS = words
-    return _SYMPTOM_WORDS
+# Kick off the heavyweight helpers (scenarios.txt parse, NLTK setup) in the
+# background without blocking startup.
+_warm_heavy_helpers_async()
 
 
+@lru_cache(maxsize=256)
 def _is_greeting(text: str) -> bool:
     t = (text or '').strip().lower()
     if not t:
         return True
-    return bool(re.fullmatch(r"(hi|hey|hello|hy|hii+|good\s*(morning|afternoon|evening))\b[!. ]*", t))
+    return bool(_GREETING_RE.fullmatch(t))
+
+
+# Server-side chat store: the cookie only carries a small random id, while the
+# rendered HTML history lives in-process. Serializing 30 HTML bubbles into the
+# signed cookie made every request re-sign and re-upload kilobytes of payload.
+_CHAT_STORE: dict[str, list] = {}
+_CHAT_STORE_MAX_SESSIONS = 1000
+_CHAT_STORE_MAX_MESSAGES = 30
+
+# Bot bubbles with medicine cards run to several KB of HTML; store those
+# zlib-compressed and inflate on read. Short messages stay as-is.
+_CHAT_COMPRESS_MIN_BYTES = 2048
+
+
+def _pack_message(role: str, text: str) -> dict:
+    raw = (text or '').encode('utf-8')
+    if len(raw) >= _CHAT_COMPRESS_MIN_BYTES:
+        return {'role': role, 'z': zlib.compress(raw, 6)}
+    return {'role': role, 'text': text}
+
+
+def _unpack_message(msg: dict) -> dict:
+    if 'z' in msg:
+        return {'role': msg['role'], 'text': zlib.decompress(msg['z']).decode('utf-8')}
+    return msg
+
+
+def _get_chat_id() -> str:
+    chat_id = session.get('chat_id')
+    if not chat_id:
+        chat_id = uuid.uuid4().hex
+        session['chat_id'] = chat_id
+        # Shed the oldest sessions rather than growing without bound.
+        while len(_CHAT_STORE) >= _CHAT_STORE_MAX_SESSIONS:
+            _CHAT_STORE.pop(next(iter(_CHAT_STORE)), None)
+    return chat_id
 
 
 def _get_chat_history():
-    return session.get('chat_history', [])
+    return [_unpack_message(m) for m in _CHAT_STORE.get(_get_chat_id(), [])]
 
 
 def _set_chat_history(history):
-    session['chat_history'] = history[-30:]
+    _CHAT_STORE[_get_chat_id()] = [_pack_message(m['role'], m.get('text') or '') for m in history[-_CHAT_STORE_MAX_MESSAGES:]]
 
 
 def _append_message(role: str, text: str):
+    # Append in place on the packed store; no unpack/repack of older messages.
+    packed = _CHAT_STORE.setdefault(_get_chat_id(), [])
+    packed.append(_pack_message(role, text))
+    del packed[:-_CHAT_STORE_MAX_MESSAGES]
+
+
+def _replay_if_duplicate(message: str) -> str | None:
+    """Return the previous bot reply when the user resubmits the same message.
+
+    Called after the new user message has been appended: history[-3] is the
+    previous user message and history[-2] the bot reply it produced. Reusing
+    that reply skips the whole analysis pass on double-submits/page reloads.
+    """
     history = _get_chat_history()
-    history.append({'role': role, 'text': text})
-    _set_chat_history(history)
-    return history
+    if len(history) < 3:
+        return None
+    prev_user, prev_bot = history[-3], history[-2]
+    if prev_user.get('role') != 'user' or prev_bot.get('role') != 'bot':
+        return None
+    if (prev_user.get('text') or '').strip() != message:
+        return None
+    return prev_bot.get('text') or None
 
 
 def analyze_symptoms(text, user_name: str | None = None):
+    """Analyze a symptom description and build the bot reply.
+
+    Responses are memoized per (canonicalized text, user name): the rolling
+    symptom history and repeated questions frequently replay identical input,
+    and the reply is fully determined by these two values.
+    """
+    canonical = ' '.join((text or '').lower().split())
+    return _analyze_symptoms_cached(canonical, user_name)
+
+
+@lru_cache(maxsize=128)
+def _analyze_symptoms_cached(text: str, user_name: str | None):
     name_prefix = (f"{_html_escape(user_name)}, " if user_name else "")
 
-    tokens = preprocessor.preprocess(text)
     symptom_words = _get_symptom_words()
 
-    # Use lightweight normalized tokens for matching against medicines.json strings.
+    # Lightweight normalized tokens, shared by the signal check and the OTC
+    # hint below — no NLTK pipeline on the hot path.
     norm_tokens = DiseasePredictionModel.normalize_text(text).split()
+    norm_token_set = set(norm_tokens)
     relevant_tokens = [t for t in norm_tokens if t in symptom_words]
     unique_relevant_count = len(set(relevant_tokens))
 
@@ -651,111 +999,102 @@ def analyze_symptoms(text, user_name: str | None = None):
     }
     has_high_signal = bool(set(relevant_tokens) & high_signal_single_symptoms)
 
-    recommendations = _recommend_one_medicine_per_cluster(text, max_clusters=3)
-
     # If the user only provided 0–1 symptom keywords, avoid guessing (common cause of wrong meds).
     # Exception: allow high-signal single symptoms (e.g., diarrhea, vomiting, UTI-like burning).
     if unique_relevant_count < 2 and not has_high_signal:
         otc = None
-        token_set = set(tokens)
-        if {'fever', 'temperature', 'headache', 'pain', 'aches', 'ache'}.intersection(token_set):
+        if {'fever', 'temperature', 'headache', 'pain', 'aches', 'ache'} & norm_token_set:
             otc = 'acetaminophen (paracetamol)'
 
         bot_message = (
             f"<div><strong>Symptoms</strong></div>"
             f"<div style=\"margin-top:0.35rem;\">{name_prefix}I’m sorry you’re feeling unwell. I don’t have enough detail to name a likely condition yet.</div><br>"
             + (f"<strong>Common OTC option:</strong> {otc} (follow the label directions)<br><br>" if otc else "")
-            + "<strong>Quick questions:</strong><br>"
-            + "1) How long have you had these symptoms?<br>"
-            + "2) What are the top 3 symptoms (for example: cough/sore throat, vomiting/diarrhea, burning urination, headache)?<br>"
-            + "3) Any emergency warning signs (chest pain, trouble breathing, confusion, blood in vomit/stool/urine)?<br><br>"
-            + "<strong>Safety note:</strong> Seek medical care urgently if symptoms are severe or worsening."
-            + _render_style_followups(text, limit=3)
+            + _QUICK_QUESTIONS_FULL_HTML
+            + _render_style_followups(text, limit=3, user_tokens=norm_token_set)
         )
         return {'bot_message': bot_message, 'had_recommendations': False}
 
-    # Use medicines.json as the medical knowledge base.
+    # Use medicines.json as the medical knowledge base. Only scan the catalog
+    # once we know the input has enough signal to act on.
+    recommendations = _recommend_one_medicine_per_cluster(text, max_clusters=3)
+
     # Patient-facing response only (no confidence/stats)
     if not recommendations:
         bot_message = (
             f"<div><strong>Symptoms</strong></div>"
             f"<div style=\"margin-top:0.35rem;\">{name_prefix}I’m sorry you’re feeling unwell. I can’t name a likely condition from that alone.</div><br>"
-            "<strong>Quick questions:</strong><br>"
-            "1) How long have you had these symptoms?<br>"
-            "2) What other symptoms do you have (cough/sore throat, vomiting/diarrhea, shortness of breath)?<br><br>"
-            "<strong>Safety note:</strong> Seek medical care urgently if symptoms are severe or worsening."
-            + _render_style_followups(text, limit=3)
+            + _QUICK_QUESTIONS_SHORT_HTML
+            + _render_style_followups(text, limit=3, user_tokens=norm_token_set)
         )
         return {'bot_message': bot_message, 'had_recommendations': False}
 
-    # Render concise: one medicine per detected disease.
-    rec_lines = []
-    for rec in recommendations:
-        disease = rec.get('cluster_label') or 'Possible condition'
-        med = rec.get('medicine') or {}
-        med_name = (med.get('name') or '').strip() or 'a suitable medicine'
-        dosage = (med.get('dosage') or '').strip()
-        url = (med.get('url') or '').strip()
-        img = (med.get('image') or '').strip()
-
-        # Image is required by design; selection filters items without image.
-        img_html = (
-            f"<div style=\"margin-top:0.35rem;\">"
-            f"<img src=\"{img}\" alt=\"{_html_escape(med_name)}\" "
-            f"style=\"max-width:160px; width:160px; height:auto; border-radius:10px; border:1px solid rgba(255,255,255,0.06);\">"
-            f"</div>"
-        )
+    # Render concise: one medicine per detected disease, in a single template
+    # pass. Image is required by design; selection filters items without one.
+    bot_message = _RECOMMENDATION_REPLY_TEMPLATE.render(
+        user_name=user_name,
+        recs=recommendations,
+        followups_html=_render_style_followups(text, limit=3, user_tokens=norm_token_set),
+        safety_note=_SAFETY_NOTE,
+    )
 
-        parts = [f"<strong>{_html_escape(disease)}:</strong> {med_name}"]
-        if dosage:
-            parts.append(f" — <em>Dosage:</em> {dosage}")
-        if url:
-            parts.append(f" <a href=\"{url}\" target=\"_blank\" rel=\"noopener noreferrer\">View</a>")
-
-        why = rec.get('why') or []
-        why_html = ''
-        if why:
-            why_html = (
-                "<div style=\"margin-top: 0.25rem; color: rgba(255,255,255,0.78);\">"
-                "<em>Why this medicine:</em> " + "; ".join(why[:3]) +
-                "</div>"
-            )
-
-        rec_lines.append(
-            "<li style=\"margin-bottom: 0.75rem;\">" + ''.join(parts) + img_html + why_html + "</li>"
-        )
+    return {'bot_message': bot_message, 'had_recommendations': True}
 
-    medicines_html = (
-        "<div><strong>Recommendations</strong></div>"
-        "<div style=\"margin-top:0.35rem;\">One best medicine per detected condition (not an exhaustive list).</div>"
-        "<ul style=\"margin: 0.5rem 0 0.75rem 1.25rem;\">"
-        + ''.join(rec_lines)
-        + "</ul>"
-        "<div style=\"color: rgba(255,255,255,0.75); font-size: 0.95em;\">"
-        "Educational only — always follow the label and consult a clinician if unsure."
-        "</div>"
-    )
 
-    safety = "Seek medical care urgently if symptoms are severe or worsening."
 
-    bot_message = (
-        f"<div><strong>Summary</strong></div>"
-        f"<div style=\"margin-top:0.35rem;\">{name_prefix}here’s what I found from your symptoms:</div><br>"
-        + medicines_html
-        + "<br>"
-        + _render_style_followups(text, limit=3)
-        + f"<div style=\"margin-top:0.65rem;\"><strong>Safety note:</strong> {safety}</div>"
-    )
+# Compressible response types: chat JSON and rendered pages shrink ~5-10x.
+_COMPRESSIBLE_MIMETYPES = {'text/html', 'application/json', 'text/css', 'application/javascript'}
+_COMPRESS_MIN_RESPONSE_BYTES = 500
 
-    return {'bot_message': bot_message, 'had_recommendations': True}
 
+@app.after_request
+def _gzip_response(response):
+    """Gzip text responses for clients that accept it (stdlib, no middleware dep)."""
+    if response.direct_passthrough or response.status_code != 200:
+        return response
+    if response.headers.get('Content-Encoding'):
+        return response
+    if response.mimetype not in _COMPRESSIBLE_MIMETYPES:
+        return response
+    if 'gzip' not in (request.headers.get('Accept-Encoding') or '').lower():
+        return response
+
+    data = response.get_data()
+    if len(data) < _COMPRESS_MIN_RESPONSE_BYTES:
+        return response
+
+    response.set_data(gzip.compress(data, 6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.headers.add('Vary', 'Accept-Encoding')
+    return response
+
+
+def _analyze_with_history(query: str) -> str:
+    """Fold ``query`` into the rolling symptom history and analyze the result.
+
+    Shared by the GET and POST chat paths so the history handling (and the
+    caching keyed on the combined text) lives in one place. The combined text
+    only changes when a genuinely new phrase arrives, so repeated turns hit the
+    analyzer's memoized path instead of re-tokenizing the whole history.
+    """
+    symptom_history = session.get('symptom_history') or []
+    # Repeating an earlier phrase shouldn't grow the combined text.
+    if query not in symptom_history:
+        symptom_history.append(query)
+    session['symptom_history'] = symptom_history[-5:]
+    combined_text = ' '.join(session['symptom_history'])
+    analysis = analyze_symptoms(combined_text, user_name=session.get('user_name'))
+    if analysis.get('had_recommendations'):
+        session['symptom_history'] = []
+    return analysis.get('bot_message', '')
 
 
 @app.route('/', methods=['GET'])
 def index():
     # Optional reset clears the multi-turn context
     if request.args.get('reset'):
-        session.pop('chat_history', None)
+        _CHAT_STORE.pop(session.pop('chat_id', ''), None)
+        session.pop('chat_history', None)  # legacy cookie-stored history
         session.pop('user_name', None)
         session.pop('stage', None)
         session.pop('symptom_history', None)
@@ -775,28 +1114,18 @@ def index():
         if stage == 'awaiting_name':
             name = _extract_name(query)
             if not name:
-                bot_message = (
-                    "I didn’t catch your name. May I know your name?"
-                )
+                bot_message = _NAME_RETRY_MESSAGE
             else:
                 session['user_name'] = name
                 session['stage'] = 'awaiting_symptoms'
-                bot_message = (
-                    f"Nice to meet you, <strong>{_html_escape(name)}</strong>!<br><br>"
-                    "<div><strong>Symptoms</strong></div>"
-                    "<div style=\"margin-top:0.35rem;\">How can I help today? Please describe your symptoms (and how long you’ve had them).</div>"
-                )
+                bot_message = _MEET_GREETING_TEMPLATE.format(name=_html_escape(name))
             _append_message('bot', bot_message)
         else:
-            symptom_history = session.get('symptom_history') or []
-            symptom_history.append(query)
-            session['symptom_history'] = symptom_history[-5:]
-            combined_text = ' '.join(session['symptom_history'])
-            analysis = analyze_symptoms(combined_text, user_name=session.get('user_name'))
-            bot_message = analysis.get('bot_message', '')
-            if analysis.get('had_recommendations'):
-                session['symptom_history'] = []
-            _append_message('bot', bot_message)
+            replayed = _replay_if_duplicate(query)
+            if replayed is not None:
+                _append_message('bot', replayed)
+            else:
+                _append_message('bot', _analyze_with_history(query))
 
     return render_template('index.html', chat_history=_get_chat_history(), welcome_message=welcome_message)
 
@@ -816,28 +1145,21 @@ def chat():
     if stage == 'awaiting_name':
         name = _extract_name(message)
         if not name:
-            bot_message = "I didn’t catch your name. May I know your name?"
+            bot_message = _NAME_RETRY_MESSAGE
         else:
             session['user_name'] = name
             session['stage'] = 'awaiting_symptoms'
-            bot_message = (
-                f"Nice to meet you, <strong>{_html_escape(name)}</strong>!<br><br>"
-                "<div><strong>Symptoms</strong></div>"
-                "<div style=\"margin-top:0.35rem;\">How can I help today? Please describe your symptoms (and how long you’ve had them).</div>"
-            )
+            bot_message = _MEET_GREETING_TEMPLATE.format(name=_html_escape(name))
         _append_message('bot', bot_message)
         return jsonify({'ok': True, 'messages': _get_chat_history()})
 
     # awaiting_symptoms
-    symptom_history = session.get('symptom_history') or []
-    symptom_history.append(message)
-    session['symptom_history'] = symptom_history[-5:]
-    combined_text = ' '.join(session['symptom_history'])
-    analysis = analyze_symptoms(combined_text, user_name=session.get('user_name'))
-    bot_message = analysis.get('bot_message', '')
-    if analysis.get('had_recommendations'):
-        session['symptom_history'] = []
-    _append_message('bot', bot_message)
+    replayed = _replay_if_duplicate(message)
+    if replayed is not None:
+        _append_message('bot', replayed)
+        return jsonify({'ok': True, 'messages': _get_chat_history()})
+
+    _append_message('bot', _analyze_with_history(message))
     return jsonify({'ok': True, 'messages': _get_chat_history()})
 
 
@@ -8,8 +8,62 @@ This project intentionally separates:
 trains or persists any ML model.
 """
 
+import heapq
 import json
+import os
+import pickle
 import re
+import sys
+from collections import Counter
+from functools import lru_cache
+
+# orjson parses large JSON files several times faster than the stdlib; fall
+# back silently when it isn't installed.
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+
+# One event per scenario line: a "Scenario N" boundary or a Patient:/Doctor:
+# turn. A single finditer sweep replaces the old split-then-splitlines passes.
+_SCENARIO_EVENT_RE = re.compile(
+    r"(?im)^\s*(?:(?P<header>scenario\s+\d+)|(?P<role>patient|doctor)\s*:\s*(?P<line>.*?))\s*$"
+)
+
+# normalize_text helpers: the URL strip only runs when a URL marker is present,
+# and for ASCII text (the overwhelmingly common case) the punctuation/digit
+# cleanup is one C-level translate pass instead of a regex substitution. The
+# regex remains as the non-ASCII fallback so output is unchanged.
+_NORMALIZE_URL_RE = re.compile(r"http\S+|www\S+")
+_NORMALIZE_NON_ALPHA_RE = re.compile(r"[^a-z\s]")
+_NORMALIZE_TABLE = {
+    cp: ' ' for cp in range(128)
+    if not ('a' <= chr(cp) <= 'z' or chr(cp).isspace())
+}
+
+# Callers never request more follow-up lines than this, so anything past the
+# cap is dead weight in the 50k-scenario corpus.
+_MAX_DOCTOR_LINES_PER_SCENARIO = 8
+
+# Parsed-scenario sidecar cache: parsing the 31MB corpus costs seconds per
+# process start, loading the pickle takes a fraction of that. Bump the version
+# whenever the parse output format changes.
+_SCENARIO_CACHE_DIR = 'cache'
+_SCENARIO_CACHE_VERSION = 1
+
+
+def _scenario_cache_path(scenario_path: str) -> str:
+    return os.path.join(_SCENARIO_CACHE_DIR, os.path.basename(scenario_path) + '.pkl')
+
+
+def _load_json_file(path: str):
+    """Parse a JSON file with orjson when available, stdlib json otherwise."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if _orjson is not None:
+        return _orjson.loads(raw)
+    return json.loads(raw)
 
 
 class DiseasePredictionModel:
@@ -59,9 +113,12 @@ class DiseasePredictionModel:
         self.diseases = []
         self.symptoms_map = {}
 
-        # Scenario dialog samples used for style follow-ups.
-        # Each entry: {"patient_text": str, "tokens": set[str], "doctor_lines": list[str]}
-        self._scenario_dialog_samples = []
+        # Scenario dialog samples used for style follow-ups, stored as parallel
+        # arrays (structure-of-arrays): the scoring loop touches only the token
+        # sets, so keeping them in their own compact list avoids a dict lookup
+        # per scenario per query.
+        self._scn_tokens = []        # frozenset[str] per scenario
+        self._scn_doctor_lines = []  # tuple[str, ...] per scenario
 
         # Load legacy disease data (best-effort). This project uses medicines.json differently,
         # so this usually results in an empty dataset and that's OK.
@@ -69,22 +126,39 @@ class DiseasePredictionModel:
 
         # Load dialog samples from scenarios (style-only).
         for sp in self.scenario_paths:
-            self._scenario_dialog_samples.extend(self._load_scenarios(sp))
-
+            for tokens, doctor_lines in self._load_scenarios(sp):
+                self._scn_tokens.append(tokens)
+                self._scn_doctor_lines.append(doctor_lines)
+
+        # Inverted index: token -> list of scenario ids containing it. Queries
+        # then touch only scenarios sharing at least one token with the user
+        # instead of scanning the whole corpus.
+        self._scn_token_index = {}
+        for idx, tokens in enumerate(self._scn_tokens):
+            for tok in tokens:
+                self._scn_token_index.setdefault(tok, []).append(idx)
+
+    # Memoized: the analyze path and repeated user messages re-normalize the
+    # same strings; scenario loading merely churns the LRU, which is cheap.
     @staticmethod
+    @lru_cache(maxsize=4096)
     def normalize_text(text: str) -> str:
         """Lightweight normalization shared by training and inference.
 
         Keeps spaces, removes punctuation/numbers, lowercases.
         """
         t = (text or "").lower()
-        t = re.sub(r"http\S+|www\S+", " ", t)
-        t = re.sub(r"[^a-z\s]", " ", t)
+        if 'http' in t or 'www' in t:
+            t = _NORMALIZE_URL_RE.sub(" ", t)
+        if t.isascii():
+            t = t.translate(_NORMALIZE_TABLE)
+        else:
+            t = _NORMALIZE_NON_ALPHA_RE.sub(" ", t)
         t = " ".join(t.split())
         return t
 
     def _load_scenarios(self, scenario_path: str):
-        """Parse a scenarios.txt file and return dialog snippets.
+        """Parse a scenarios.txt file and return (tokens, doctor_lines) pairs.
 
         We only use scenarios as a communication-style source of follow-up questions.
         """
@@ -93,93 +167,133 @@ class DiseasePredictionModel:
             return dialog_samples
 
         try:
-            with open(scenario_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except FileNotFoundError:
+            source_stat = os.stat(scenario_path)
+        except OSError:
             return dialog_samples
 
-        blocks = re.split(r"\n\s*Scenario\s+\d+\s*\n", "\n" + content.strip(), flags=re.IGNORECASE)
-
-        for block in blocks:
-            block = block.strip()
-            if not block:
-                continue
-
-            patient_lines = []
-            doctor_lines = []
-            for line in block.splitlines():
-                line = line.strip()
-                if line.lower().startswith('patient:'):
-                    patient_lines.append(line.split(':', 1)[1].strip())
-                elif line.lower().startswith('doctor:'):
-                    doctor_lines.append(line.split(':', 1)[1].strip())
-
-            patient_text = self.normalize_text(' '.join(patient_lines))
-            if not patient_text or not doctor_lines:
-                continue
+        # Reuse the parsed corpus when the source file hasn't changed.
+        cache_key = (_SCENARIO_CACHE_VERSION, source_stat.st_mtime, source_stat.st_size)
+        cache_path = _scenario_cache_path(scenario_path)
+        try:
+            with open(cache_path, 'rb') as f:
+                key, cached = pickle.load(f)
+            if key == cache_key:
+                return cached
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
 
-            tokens = set(patient_text.split())
-            if not tokens:
-                continue
+        try:
+            # Binary read + one decode: skips text-mode newline translation
+            # and incremental decoding on the 31MB file. The parse regex
+            # tolerates any stray \r via its trailing \s*.
+            with open(scenario_path, 'rb') as f:
+                content = f.read().decode('utf-8', errors='replace')
+        except FileNotFoundError:
+            return dialog_samples
 
-            dialog_samples.append({
-                'patient_text': patient_text,
-                'tokens': tokens,
-                'doctor_lines': doctor_lines,
-            })
+        patient_lines = []
+        doctor_lines = []
+
+        def flush():
+            if patient_lines and doctor_lines:
+                patient_text = self.normalize_text(' '.join(patient_lines))
+                # Interned: the same vocabulary repeats across 50k scenarios,
+                # so duplicates collapse to one object and set hashing gets
+                # the identity fast path.
+                tokens = frozenset(map(sys.intern, patient_text.split()))
+                if tokens:
+                    # Store only what the hit path can emit: non-empty, unique
+                    # (order-preserving), capped per scenario.
+                    kept = tuple(dict.fromkeys(
+                        line for line in doctor_lines if line
+                    ))[:_MAX_DOCTOR_LINES_PER_SCENARIO]
+                    if kept:
+                        dialog_samples.append((tokens, kept))
+            patient_lines.clear()
+            doctor_lines.clear()
+
+        # One regex sweep over the whole file: "Scenario N" closes the current
+        # block, Patient:/Doctor: turns accumulate into it.
+        for event in _SCENARIO_EVENT_RE.finditer(content):
+            if event['header'] is not None:
+                flush()
+            elif event['role'][0] in 'pP':
+                patient_lines.append(event['line'])
+            else:
+                doctor_lines.append(event['line'])
+        flush()
+
+        # Best-effort cache write; parsing succeeds regardless.
+        try:
+            os.makedirs(_SCENARIO_CACHE_DIR, exist_ok=True)
+            with open(cache_path, 'wb') as f:
+                pickle.dump((cache_key, dialog_samples), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass
 
         return dialog_samples
     
     def load_data(self):
         """Load disease and symptom data from one or more JSON files and merge duplicates."""
         merged = {}
+        # Live dedup sets per disease name, kept alongside `merged` so merging
+        # repeated entries never rebuilds a set from the accumulated lists.
+        seen_symptoms = {}
+        seen_med_names = {}
 
         for path in self.data_paths:
             try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    items = data.get('diseases', []) if isinstance(data, dict) else data
-
-                    for disease in items:
-                        if not isinstance(disease, dict):
-                            continue
-
-                        # Normalize name
-                        name = disease.get('name', '').strip()
-                        if not name:
-                            continue
-
-                        # Guard: only accept objects that actually look like a disease entry.
-                        symptoms = disease.get('symptoms')
-                        if not isinstance(symptoms, list) or len(symptoms) == 0:
-                            continue
-
-                        if name in merged:
-                            # Merge symptoms
-                            existing = merged[name]
-                            existing_symptoms = set(existing.get('symptoms', []))
-                            for s in disease.get('symptoms', []):
-                                if s not in existing_symptoms:
-                                    existing.setdefault('symptoms', []).append(s)
-                                    existing_symptoms.add(s)
-
-                            # Merge medicines by name
-                            existing_meds = existing.setdefault('medicines', [])
-                            existing_med_names = set(m.get('name') for m in existing_meds)
-                            for m in disease.get('medicines', []):
-                                if m.get('name') not in existing_med_names:
-                                    existing_meds.append(m)
-                                    existing_med_names.add(m.get('name'))
-                        else:
-                            # Add a shallow copy to avoid modifying source
-                            merged[name] = {
-                                'name': name,
-                                'symptoms': list(symptoms),
-                                'medicines': list(disease.get('medicines', []))
-                            }
+                data = _load_json_file(path)
+                items = data.get('diseases', []) if isinstance(data, dict) else data
+
+                for disease in items:
+                    if not isinstance(disease, dict):
+                        continue
+
+                    # Normalize name
+                    name = disease.get('name', '').strip()
+                    if not name:
+                        continue
+
+                    # Guard: only accept objects that actually look like a disease entry.
+                    symptoms = disease.get('symptoms')
+                    if not isinstance(symptoms, list) or len(symptoms) == 0:
+                        continue
+
+                    existing = merged.get(name)
+                    if existing is None:
+                        # Add a shallow copy to avoid modifying source; intern
+                        # symptoms since they repeat heavily across diseases.
+                        medicines = list(disease.get('medicines', []))
+                        merged[name] = {
+                            'name': name,
+                            'symptoms': [sys.intern(s) if isinstance(s, str) else s
+                                         for s in symptoms],
+                            'medicines': medicines,
+                        }
+                        seen_symptoms[name] = set(symptoms)
+                        seen_med_names[name] = set(m.get('name') for m in medicines)
+                        continue
+
+                    # Merge symptoms
+                    existing_symptoms = seen_symptoms[name]
+                    for s in symptoms:
+                        if s not in existing_symptoms:
+                            if isinstance(s, str):
+                                s = sys.intern(s)
+                            existing['symptoms'].append(s)
+                            existing_symptoms.add(s)
+
+                    # Merge medicines by name
+                    existing_med_names = seen_med_names[name]
+                    for m in disease.get('medicines', []):
+                        if m.get('name') not in existing_med_names:
+                            existing['medicines'].append(m)
+                            existing_med_names.add(m.get('name'))
             except FileNotFoundError:
                 print(f"Warning: Could not find data file at {path}")
-            except json.JSONDecodeError:
+            except ValueError:
+                # Covers json.JSONDecodeError and orjson.JSONDecodeError alike.
                 print(f"Warning: Could not parse JSON file at {path}")
 
         # Convert merged dict to list
@@ -194,41 +308,51 @@ class DiseasePredictionModel:
                     self.symptoms_map[symptom] = []
                 self.symptoms_map[symptom].append(disease_name)
 
-    def get_scenario_followups(self, text: str, top_k: int = 2):
+    def get_scenario_followups(self, text: str, top_k: int = 2, user_tokens=None):
         """Return doctor follow-up lines from the most similar scenarios.
 
-        Similarity is computed via token overlap against the scenario's patient text.
+        Similarity is computed via token overlap against the scenario's patient
+        text. Callers that already normalized and tokenized the text can pass
+        the set via ``user_tokens`` to skip doing it again here.
         """
-        if not self._scenario_dialog_samples or top_k <= 0:
+        if not self._scn_tokens or top_k <= 0:
             return []
 
-        user_tokens = set(self.normalize_text(text).split())
+        if user_tokens is None:
+            user_tokens = set(self.normalize_text(text).split())
         if not user_tokens:
             return []
 
+        # Walk only the user's tokens through the inverted index; the Counter
+        # ends up holding |user ∩ scenario| for every scenario that shares at
+        # least one token (user_tokens is a set, so each shared token counts once).
+        hits = Counter()
+        index = self._scn_token_index
+        for tok in user_tokens:
+            ids = index.get(tok)
+            if ids:
+                hits.update(ids)
+
         scored = []
-        for idx, sample in enumerate(self._scenario_dialog_samples):
-            tokens = sample.get('tokens') or set()
-            if not tokens:
-                continue
-            common = len(user_tokens & tokens)
-            if common <= 0:
-                continue
+        scn_tokens = self._scn_tokens
+        for idx, common in hits.items():
+            n_tokens = len(scn_tokens[idx])
             # Prefer higher overlap, then slightly prefer smaller scenarios (more specific).
-            overlap = common / max(1, len(tokens))
-            scored.append((overlap, common, -len(tokens), -idx))
+            overlap = common / n_tokens
+            scored.append((overlap, common, -n_tokens, -idx))
 
         if not scored:
             return []
 
-        scored.sort(reverse=True)
+        # Each scenario contributes at least one line, so the top_k best
+        # scenarios are all we ever need — no full sort of the hit list.
+        best = heapq.nlargest(top_k, scored)
         followups = []
-        for _, __, ___, neg_idx in scored:
-            sample = self._scenario_dialog_samples[-neg_idx]
-            for line in (sample.get('doctor_lines') or []):
-                if line:
-                    followups.append(line)
-                    if len(followups) >= top_k:
-                        return followups[:top_k]
-
-        return followups[:top_k]
\ No newline at end of file
+        for _, __, ___, neg_idx in best:
+            # Lines were sanitized at load time: non-empty and unique already.
+            for line in self._scn_doctor_lines[-neg_idx]:
+                followups.append(line)
+                if len(followups) >= top_k:
+                    return followups
+
+        return followups
\ No newline at end of file
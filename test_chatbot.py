@@ -6,10 +6,6 @@ This project uses:
 """
 
 import sys
-import os
-
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from models.disease_predictor import DiseasePredictionModel
 from utils.preprocessing import TextPreprocessor
